@@ -1,35 +1,77 @@
-from expr import Binary, Expr, Grouping, Literal, Ternary, Unary, Visitor
-from langtypes import Number
+import io
+import math
+from typing import TextIO
+
+from expr import (
+    Binary,
+    Expr,
+    Grouping,
+    Literal,
+    Ternary,
+    Unary,
+    Variable,
+    Visitor,
+)
+from langtypes import Number, String
+from lines import LineTable
 from tokens import Token, TokenType
 
 
-class AstPrinter(Visitor[str]):
+class AstPrinter(Visitor[list[str | Expr]]):
+    """
+    Serializes expressions as S-expressions that `AstReader` can load back.
+    Each visit returns the node's text with its children left in place, and
+    `dump` expands them with an explicit stack, so output is streamed without
+    recursion or copying child strings into their parents.
+    """
+
     def print(self, expr: Expr) -> str:
-        return expr.accept(self)
+        out = io.StringIO()
+        self.dump(expr, out)
+        return out.getvalue()
+
+    def dump(self, expr: Expr, out: TextIO) -> None:
+        pending: list[str | Expr] = [expr]
+        while pending:
+            piece = pending.pop()
+            if isinstance(piece, str):
+                out.write(piece)
+            else:
+                pending.extend(reversed(piece.accept(self)))
+
+    def visit_ternary(self, ternary: Ternary) -> list[str | Expr]:
+        return ["(?: ", ternary.cmp, " ", ternary.left, " ", ternary.right, ")"]
 
-    def visit_ternary(self, ternary: Ternary) -> str:
-        return f"(?: {self.print(ternary.cmp)} {self.print(ternary.left)} {self.print(ternary.right)})"
+    def visit_binary(self, binary: Binary) -> list[str | Expr]:
+        return [f"({binary.operator.lexeme} ", binary.left, " ", binary.right, ")"]
 
-    def visit_binary(self, binary: Binary) -> str:
-        return f"({binary.operator.lexeme} {self.print(binary.left)} {self.print(binary.right)})"
+    def visit_grouping(self, grouping: Grouping) -> list[str | Expr]:
+        return ["(group ", grouping.expression, ")"]
 
-    def visit_grouping(self, grouping: Grouping) -> str:
-        return f"(group {self.print(grouping.expression)})"
+    def visit_literal(self, literal: Literal) -> list[str | Expr]:
+        match literal.value:
+            case None:
+                return ["nil"]
+            case String(s):
+                return [f'"{s}"']
+            case Number(n) if not math.isfinite(n):
+                # signed, so that inf and nan can't be read back as identifiers
+                return [f"{n:+}"]
+            case other:
+                return [repr(other)]
 
-    def visit_literal(self, literal: Literal) -> str:
-        if literal.value is None:
-            return "nil"
-        else:
-            return str(literal.value)
+    def visit_unary(self, unary: Unary) -> list[str | Expr]:
+        return [f"({unary.operator.lexeme} ", unary.right, ")"]
 
-    def visit_unary(self, unary: Unary) -> str:
-        return f"({unary.operator.lexeme} {self.print(unary.right)})"
+    def visit_variable(self, variable: Variable) -> list[str | Expr]:
+        return [variable.name.lexeme]
 
 
 if __name__ == "__main__":
+    lines = LineTable("-123 * (45.67)")
     expression = Binary(
-        Unary(Token(TokenType.MINUS, "-", None, 1), Literal(Number(123))),
-        Token(TokenType.STAR, "*", None, 1),
+        Unary(Token(TokenType.MINUS, "-", None, 0, lines), Literal(Number(123))),
+        Token(TokenType.STAR, "*", None, 5, lines),
         Grouping(Literal(Number(45.67))),
     )
     print("raw")
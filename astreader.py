@@ -0,0 +1,124 @@
+import re
+from typing import TextIO
+
+from expr import Binary, Expr, Grouping, Literal, Ternary, Unary, Variable
+from langtypes import Bool, Number, String
+from lines import LineTable
+from scanner import KEYWORDS
+from tokens import Token, TokenType
+
+
+OPERATORS: dict[str, TokenType] = {
+    ",": TokenType.COMMA,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    "/": TokenType.SLASH,
+    "*": TokenType.STAR,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ATOM = re.compile(r'\s*(?:(\()|(\))|("[^"]*")|([^\s()"]+))')
+
+
+class ReadError(ValueError):
+    def __init__(self, offset: int, message: str) -> None:
+        super().__init__(f"{message} at offset {offset}")
+        self.offset: int = offset
+
+
+class AstReader:
+    """
+    Loads the S-expressions written by `AstPrinter` back into `Expr` nodes.
+    Lists are assembled on an explicit stack, so arbitrarily deep trees load
+    without recursion. Operator tokens point into the text they were read from.
+    """
+
+    def load(self, file: TextIO) -> Expr:
+        return self.read(file.read())
+
+    def read(self, text: str) -> Expr:
+        lines = LineTable(text)
+        # each open list: the offset and text of its head, then its children
+        stack: list[tuple[int, str, list[Expr]]] = []
+        result: Expr | None = None
+        offset = 0
+        while True:
+            match_ = _ATOM.match(text, offset)
+            if match_ is None or match_.end() == offset:
+                break
+            start, offset = match_.start(match_.lastindex or 0), match_.end()
+            if result is not None:
+                raise ReadError(start, "unexpected text after expression")
+            match match_.lastindex:
+                case 1:
+                    head = _ATOM.match(text, offset)
+                    if head is None or head.lastindex != 4:
+                        raise ReadError(offset, "expected operator after '('")
+                    stack.append((head.start(4), head.group(4), []))
+                    offset = head.end()
+                    continue
+                case 2:
+                    if not stack:
+                        raise ReadError(start, "unbalanced ')'")
+                    head_offset, head, children = stack.pop()
+                    node = self._node(lines, head_offset, head, children)
+                case 3:
+                    node = Literal(String(match_.group(3)[1:-1]))
+                case _:
+                    node = self._atom(lines, start, match_.group(4))
+            if stack:
+                stack[-1][2].append(node)
+            else:
+                result = node
+        if text[offset:].strip():
+            raise ReadError(offset, "unterminated string")
+        if stack:
+            raise ReadError(len(text), "unbalanced '('")
+        if result is None:
+            raise ReadError(len(text), "expected expression")
+        return result
+
+    def _node(
+        self, lines: LineTable, offset: int, head: str, children: list[Expr]
+    ) -> Expr:
+        match (head, children):
+            case ("group", [expression]):
+                return Grouping(expression)
+            case ("?:", [cmp, left, right]):
+                return Ternary(cmp, left, right)
+            case ("-" | "!", [right]):
+                return Unary(self._operator(lines, offset, head), right)
+            case (_, [left, right]) if head in OPERATORS:
+                return Binary(left, self._operator(lines, offset, head), right)
+            case _:
+                raise ReadError(
+                    offset, f"'{head}' can't be applied to {len(children)} operands"
+                )
+
+    def _operator(self, lines: LineTable, offset: int, lexeme: str) -> Token:
+        return Token(OPERATORS[lexeme], lexeme, None, offset, lines)
+
+    def _atom(self, lines: LineTable, offset: int, atom: str) -> Expr:
+        match atom:
+            case "nil":
+                return Literal(None)
+            case "true":
+                return Literal(Bool(True))
+            case "false":
+                return Literal(Bool(False))
+            case _ if atom in KEYWORDS:
+                raise ReadError(offset, f"unexpected keyword '{atom}'")
+            case _ if _IDENTIFIER.fullmatch(atom):
+                token = Token(TokenType.IDENTIFIER, atom, None, offset, lines)
+                return Variable(token)
+        try:
+            return Literal(Number(float(atom)))
+        except ValueError:
+            raise ReadError(offset, f"unexpected '{atom}'") from None
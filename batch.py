@@ -0,0 +1,70 @@
+import io
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import pipeline
+from error import Error
+from interpreter import Interpreter
+from langtypes import LoxType
+from limits import Budget, Limits
+from pipeline import Evaluation
+
+
+@dataclass(frozen=True)
+class RunResult:
+    value: LoxType
+    had_error: bool
+    had_runtime_error: bool
+    diagnostics: str
+
+
+def evaluate(
+    source: str, limits: Limits = Limits(), budget: Budget = Budget()
+) -> RunResult:
+    """
+    Scans, parses and evaluates `source` with its own `Error` context and
+    interpreter, so any number of calls can run concurrently.
+    """
+    out = io.StringIO()
+    errors = Error(out)
+    evaluation = pipeline.evaluate(source, errors, Interpreter(limits, budget))
+    return _result(evaluation, errors, out)
+
+
+async def evaluate_async(
+    source: str, limits: Limits = Limits(), budget: Budget = Budget()
+) -> RunResult:
+    """
+    Like `evaluate`, but gives the event loop a turn while scanning, parsing
+    and evaluating. Cancelling it leaves nothing behind.
+    """
+    out = io.StringIO()
+    errors = Error(out)
+    interpreter = Interpreter(limits, budget)
+    evaluation = await pipeline.evaluate_async(source, errors, interpreter)
+    return _result(evaluation, errors, out)
+
+
+def evaluate_many(
+    sources: Iterable[str],
+    workers: int | None = None,
+    limits: Limits = Limits(),
+    budget: Budget = Budget(),
+) -> list[RunResult]:
+    """
+    Evaluates `sources` on a pool of `workers` threads, returning the results
+    in the order of `sources`. On a free-threaded build the runs proceed in
+    parallel across cores.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial(evaluate, limits=limits, budget=budget), sources))
+
+
+def _result(
+    evaluation: Evaluation | None, errors: Error, out: io.StringIO
+) -> RunResult:
+    errors.flush()
+    value = None if evaluation is None else evaluation.value
+    return RunResult(value, errors.had_error, errors.had_runtime_error, out.getvalue())
@@ -0,0 +1,79 @@
+import sys
+import time
+import timeit
+
+from batch import evaluate_many
+from error import Error
+
+from expr import Expr
+from interpreter import Interpreter
+from langtypes import LoxType
+from limits import Budget
+from parscanner import ParallelScanner
+from parser import Parser
+from scanner import Scanner
+
+
+class _Unmetered(Interpreter):
+    """The interpreter without the budget checkpoint, as a baseline."""
+
+    def _evaluate(self, expr: Expr) -> LoxType:
+        return expr.accept(self)
+
+
+def _balanced(depth: int) -> str:
+    if depth == 0:
+        return "1"
+    operand = _balanced(depth - 1)
+    return f"({operand} + {operand} * 2 - {operand})"
+
+
+def bench_budget(depth: int = 6, repeat: int = 5, number: int = 20) -> None:
+    source = _balanced(depth)
+    errors = Error()
+    expr = Parser(Scanner(source, errors).scan_tokens(), errors).parse()
+    assert expr is not None
+    interpreters = {
+        "unmetered": _Unmetered(),
+        "no budget": Interpreter(),
+        "max steps": Interpreter(budget=Budget(max_steps=sys.maxsize)),
+        "deadline": Interpreter(budget=Budget(timeout=3600.0)),
+    }
+    for name, interpreter in interpreters.items():
+        interpreter._meter = interpreter.budget.start()
+        best = min(
+            timeit.repeat(
+                lambda: interpreter._evaluate(expr), repeat=repeat, number=number
+            )
+        )
+        print(f"{name:>10}: {best / number * 1000:.3f} ms/eval")
+
+
+def bench_batch(depth: int = 5, sources: int = 64) -> None:
+    batch = [_balanced(depth)] * sources
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        evaluate_many(batch, workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>2} workers: {sources / elapsed:.1f} runs/s")
+
+
+def bench_parallel_scan(lines: int = 64, workers: int = 4) -> None:
+    source = "\n".join([_balanced(6)] * lines)
+    start = time.perf_counter()
+    Scanner(source, Error()).scan_tokens()
+    serial = time.perf_counter() - start
+    scanner = ParallelScanner(
+        source, Error(), workers=workers, chunk_size=len(source) // workers
+    )
+    start = time.perf_counter()
+    scanner.scan_tokens()
+    parallel = time.perf_counter() - start
+    print(f"    serial: {serial:.3f} s")
+    print(f"  parallel: {parallel:.3f} s ({workers} workers)")
+
+
+if __name__ == "__main__":
+    bench_budget()
+    bench_batch()
+    bench_parallel_scan()
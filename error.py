@@ -1,34 +1,120 @@
 from dataclasses import dataclass
+from typing import TextIO
+
+from lines import LineTable
 from tokens import Token, TokenType
 
 
+# Number of diagnostics after which a run stops, unless set otherwise.
+MAX_ERRORS: int = 100
+
+
 @dataclass
 class RuntimeErr(Exception):
     token: Token
     message: str
 
 
+class BudgetExceeded(RuntimeErr):
+    def __init__(self, token: Token) -> None:
+        super().__init__(token, "evaluation budget exceeded")
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    lines: LineTable
+    offset: int
+    length: int
+    where: str
+    message: str
+    runtime: bool = False
+
+    def render(self) -> str:
+        line, column = self.lines.line(self.offset), self.lines.column(self.offset)
+        if self.runtime:
+            text = f"{self.message}\n[line {line}:{column}]"
+        else:
+            text = f"[line {line}:{column}] Error{self.where}: {self.message}"
+        snippet = self.lines.snippet(self.offset, self.length)
+        return f"{text}\n{snippet}" if snippet else text
+
+
 class Error:
-    had_error: bool = False
-    had_runtime_error: bool = False
+    """
+    Diagnostic state of a single run, passed through the scanner, parser and
+    interpreter. Diagnostics are buffered until `flush` writes them to `out`,
+    or stdout when it is `None`. Once `max_errors` diagnostics have been
+    reported the context is `exhausted`, further ones are dropped, and the
+    phases stop early. `None` lifts the cap.
+    """
 
-    @classmethod
-    def error(cls, line: int, message: str) -> None:
-        cls._report(line, "", message)
+    def __init__(
+        self, out: TextIO | None = None, max_errors: int | None = MAX_ERRORS
+    ) -> None:
+        self.out: TextIO | None = out
+        self.max_errors: int | None = max_errors
+        self.had_error: bool = False
+        self.had_runtime_error: bool = False
+        self.exhausted: bool = False
+        self.diagnostics: list[Diagnostic] = []
+        self._count: int = 0
+        self._summarized: bool = False
 
-    @classmethod
-    def runtime_error(cls, err: RuntimeErr) -> None:
-        cls.had_runtime_error = True
-        print(f"{err.message}\n[line {err.token.line}]")
+    def error(
+        self, lines: LineTable, offset: int, message: str, length: int = 1
+    ) -> None:
+        self._report(Diagnostic(lines, offset, length, "", message))
 
-    @classmethod
-    def parse_error(cls, token: Token, message: str) -> None:
+    def runtime_error(self, err: RuntimeErr) -> None:
+        self.had_runtime_error = True
+        token = err.token
+        length = len(token.lexeme)
+        self._add(Diagnostic(token.lines, token.offset, length, "", err.message, True))
+
+    def parse_error(self, token: Token, message: str) -> None:
+        length = len(token.lexeme)
         if token.type is TokenType.EOF:
-            cls._report(token.line, "at end", message)
+            where = "at end"
         else:
-            cls._report(token.line, f"at '{token.lexeme}'", message)
+            where = f"at '{token.lexeme}'"
+        self._report(Diagnostic(token.lines, token.offset, length, where, message))
+
+    def fork(self) -> "Error":
+        """
+        Returns an empty context that continues this one's count, for work
+        whose diagnostics are kept only if it completes. See `merge`.
+        """
+        fork = Error(self.out, self.max_errors)
+        fork._count = self._count
+        fork.exhausted = self.exhausted
+        return fork
+
+    def merge(self, fork: "Error") -> None:
+        """
+        Takes over the diagnostics and state of a context made by `fork`.
+        """
+        self.diagnostics += fork.diagnostics
+        self.had_error |= fork.had_error
+        self.had_runtime_error |= fork.had_runtime_error
+        self.exhausted = fork.exhausted
+        self._count = fork._count
+
+    def flush(self) -> None:
+        for diagnostic in self.diagnostics:
+            print(diagnostic.render(), file=self.out)
+        self.diagnostics.clear()
+        if self.exhausted and not self._summarized:
+            print(f"Error: too many errors, stopped after {self._count}", file=self.out)
+            self._summarized = True
+
+    def _report(self, diagnostic: Diagnostic) -> None:
+        self.had_error = True
+        self._add(diagnostic)
 
-    @classmethod
-    def _report(cls, line: int, where: str, message: str) -> None:
-        print(f"[line {line}] Error{where}: {message}")
-        cls.had_error = True
+    def _add(self, diagnostic: Diagnostic) -> None:
+        if self.exhausted:
+            return
+        self.diagnostics.append(diagnostic)
+        self._count += 1
+        if self.max_errors is not None and self._count >= self.max_errors:
+            self.exhausted = True
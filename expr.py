@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
 
 from langtypes import LoxType
 from tokens import Token
@@ -27,6 +28,16 @@ class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    # inline cache owned by the interpreter: the operand types seen so far,
+    # how many times in a row they were seen, and the specialized form the
+    # node was rewritten into once warm.
+    seen: tuple[type, type] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    warmth: int = field(default=0, init=False, repr=False, compare=False)
+    quickened: Callable[[LoxType, LoxType], LoxType] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def accept[R](self, visitor: Visitor[R]) -> R:
         return visitor.visit_binary(self)
@@ -57,6 +68,14 @@ class Unary(Expr):
         return visitor.visit_unary(self)
 
 
+@dataclass
+class Variable(Expr):
+    name: Token
+
+    def accept[R](self, visitor: Visitor[R]) -> R:
+        return visitor.visit_variable(self)
+
+
 class Visitor[R](ABC):
     @abstractmethod
     def visit_ternary(self, ternary: Ternary) -> R: ...
@@ -72,3 +91,6 @@ class Visitor[R](ABC):
 
     @abstractmethod
     def visit_unary(self, unary: Unary) -> R: ...
+
+    @abstractmethod
+    def visit_variable(self, variable: Variable) -> R: ...
@@ -1,18 +1,79 @@
-from error import Error, RuntimeErr
-from expr import Binary, Expr, Grouping, Literal, Ternary, Unary, Visitor
+import asyncio
+import copy
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+
+from error import BudgetExceeded, Error, RuntimeErr
+from expr import (
+    Binary,
+    Expr,
+    Grouping,
+    Literal,
+    Ternary,
+    Unary,
+    Variable,
+    Visitor,
+)
 from langtypes import Bool, LoxType, Number, String
-from tokens import TokenType
+from lines import LineTable
+from limits import YIELD_EVERY, Budget, Limits, Meter
+from tokens import Token, TokenType
+
+
+# Number of consecutive evaluations with the same operand types after which a
+# Binary node is rewritten into its specialized form.
+WARMUP: int = 8
+
+
+@dataclass
+class QuickeningStats:
+    specializations: int = 0
+    deoptimizations: int = 0
 
 
 class Interpreter(Visitor[LoxType]):
-    def interpret(self, expr: Expr) -> None:
+    def __init__(self, limits: Limits = Limits(), budget: Budget = Budget()) -> None:
+        self.limits: Limits = limits
+        self.budget: Budget = budget
+        self.stats: QuickeningStats = QuickeningStats()
+        self._meter: Meter | None = None
+        self._bindings: Mapping[str, LoxType] = {}
+
+    def interpret(self, expr: Expr, errors: Error) -> None:
         try:
-            value = self._evaluate(expr)
-            print(_stringify(value))
+            value = self.evaluate(expr)
+            print(stringify(value))
         except RuntimeErr as err:
-            Error.runtime_error(err)
+            errors.runtime_error(err)
+
+    def evaluate(
+        self, expr: Expr, bindings: Mapping[str, LoxType] | None = None
+    ) -> LoxType:
+        # per-call state lives on a shallow copy, which shares limits, budget
+        # and stats, so concurrent calls on one interpreter don't interfere
+        call = copy.copy(self)
+        call._meter = self.budget.start()
+        call._bindings = bindings or {}
+        return call._evaluate(expr)
+
+    async def evaluate_async(
+        self,
+        expr: Expr,
+        bindings: Mapping[str, LoxType] | None = None,
+        yield_every: int = YIELD_EVERY,
+    ) -> LoxType:
+        """
+        Evaluates `expr` like `evaluate`, yielding to the event loop every
+        `yield_every` nodes.
+        """
+        evaluator = _AsyncEvaluator(
+            self, self.budget.start(), bindings or {}, yield_every
+        )
+        return await evaluator.evaluate(expr)
 
     def _evaluate(self, expr: Expr) -> LoxType:
+        if self._meter is not None and self._meter.charge():
+            raise BudgetExceeded(_nearest_token(expr))
         return expr.accept(self)
 
     def visit_literal(self, literal: Literal) -> LoxType:
@@ -21,8 +82,14 @@ class Interpreter(Visitor[LoxType]):
     def visit_grouping(self, grouping: Grouping) -> LoxType:
         return self._evaluate(grouping.expression)
 
+    def visit_variable(self, variable: Variable) -> LoxType:
+        return _lookup(self._bindings, variable)
+
     def visit_unary(self, unary: Unary) -> LoxType:
         right = self._evaluate(unary.right)
+        return self._unary(unary, right)
+
+    def _unary(self, unary: Unary, right: LoxType) -> LoxType:
         match (unary.operator.type, right):
             case (TokenType.MINUS, Number(r)):
                 return Number(r * -1)
@@ -39,6 +106,41 @@ class Interpreter(Visitor[LoxType]):
     def visit_binary(self, binary: Binary) -> LoxType:
         left = self._evaluate(binary.left)
         right = self._evaluate(binary.right)
+        return self._binary(binary, left, right)
+
+    def _binary(self, binary: Binary, left: LoxType, right: LoxType) -> LoxType:
+        quickened = binary.quickened
+        # nodes are shared between interpreters, so the string length cap is
+        # checked per call: the fast concat can't enforce it
+        if quickened is _string_concat and self.limits.max_string_length is not None:
+            return self._generic_binary(binary, left, right)
+        if quickened is not None:
+            try:
+                return quickened(left, right)
+            except _Deopt:
+                binary.quickened = None
+                binary.seen = None
+                binary.warmth = 0
+                self.stats.deoptimizations += 1
+        self._profile(binary, left, right)
+        return self._generic_binary(binary, left, right)
+
+    def _profile(self, binary: Binary, left: LoxType, right: LoxType) -> None:
+        seen = (type(left), type(right))
+        if seen != binary.seen:
+            binary.seen = seen
+            binary.warmth = 1
+            return
+        binary.warmth += 1
+        if binary.warmth == WARMUP:
+            specialized = _SPECIALIZATIONS.get((binary.operator.type, *seen))
+            if specialized is not None:
+                binary.quickened = specialized
+                self.stats.specializations += 1
+
+    def _generic_binary(
+        self, binary: Binary, left: LoxType, right: LoxType
+    ) -> LoxType:
         match (binary.operator.type, left, right):
             case (TokenType.MINUS, Number(l), Number(r)):
                 return Number(l - r)
@@ -59,11 +161,11 @@ class Interpreter(Visitor[LoxType]):
             case (TokenType.PLUS, Number(l), Number(r)):
                 return Number(l + r)
             case (TokenType.PLUS, String(l), String(r)):
-                return String(l + r)
+                return self._concat(binary.operator, l, r)
             case (TokenType.PLUS, String(l), r):
-                return String(l + _stringify(r))
+                return self._concat(binary.operator, l, stringify(r))
             case (TokenType.PLUS, l, String(r)):
-                return String(_stringify(l) + r)
+                return self._concat(binary.operator, stringify(l), r)
             case (TokenType.EQUAL_EQUAL, l, r):
                 return Bool(_is_equal(l, r))
             case (TokenType.BANG_EQUAL, l, r):
@@ -77,6 +179,12 @@ class Interpreter(Visitor[LoxType]):
                     f"binary operator '{lexeme}' can't be applied to {lclass} and {rclass}",
                 )
 
+    def _concat(self, operator: Token, left: str, right: str) -> String:
+        max_length = self.limits.max_string_length
+        if max_length is not None and len(left) + len(right) > max_length:
+            raise RuntimeErr(operator, f"string too long (limit {max_length})")
+        return String(left + right)
+
     def visit_ternary(self, ternary: Ternary) -> LoxType:
         cmp = self._evaluate(ternary.cmp)
         return (
@@ -86,6 +194,189 @@ class Interpreter(Visitor[LoxType]):
         )
 
 
+class _AsyncEvaluator(Visitor[Awaitable[LoxType]]):
+    """
+    Walks the tree like `Interpreter`, applying its operators, but awaits each
+    child so that it can yield to the event loop every `yield_every` nodes.
+    """
+
+    def __init__(
+        self,
+        interpreter: Interpreter,
+        meter: Meter | None,
+        bindings: Mapping[str, LoxType],
+        yield_every: int,
+    ) -> None:
+        self._interpreter: Interpreter = interpreter
+        self._meter: Meter | None = meter
+        self._bindings: Mapping[str, LoxType] = bindings
+        self._yield_every: int = yield_every
+        self._countdown: int = yield_every
+
+    async def evaluate(self, expr: Expr) -> LoxType:
+        if self._meter is not None and self._meter.charge():
+            raise BudgetExceeded(_nearest_token(expr))
+        self._countdown -= 1
+        if self._countdown == 0:
+            self._countdown = self._yield_every
+            await asyncio.sleep(0)
+        return await expr.accept(self)
+
+    async def visit_literal(self, literal: Literal) -> LoxType:
+        return literal.value
+
+    async def visit_grouping(self, grouping: Grouping) -> LoxType:
+        return await self.evaluate(grouping.expression)
+
+    async def visit_variable(self, variable: Variable) -> LoxType:
+        return _lookup(self._bindings, variable)
+
+    async def visit_unary(self, unary: Unary) -> LoxType:
+        right = await self.evaluate(unary.right)
+        return self._interpreter._unary(unary, right)
+
+    async def visit_binary(self, binary: Binary) -> LoxType:
+        left = await self.evaluate(binary.left)
+        right = await self.evaluate(binary.right)
+        return self._interpreter._binary(binary, left, right)
+
+    async def visit_ternary(self, ternary: Ternary) -> LoxType:
+        cmp = await self.evaluate(ternary.cmp)
+        return await self.evaluate(ternary.left if _is_truthy(cmp) else ternary.right)
+
+
+def _lookup(bindings: Mapping[str, LoxType], variable: Variable) -> LoxType:
+    try:
+        return bindings[variable.name.lexeme]
+    except KeyError:
+        raise RuntimeErr(
+            variable.name, f"undefined variable '{variable.name.lexeme}'"
+        ) from None
+
+
+def _nearest_token(expr: Expr) -> Token:
+    """
+    Finds the first operator token in `expr`, used to locate errors raised on
+    nodes that carry no token of their own.
+    """
+    pending = [expr]
+    while pending:
+        match pending.pop():
+            case Binary(operator=operator) | Unary(operator=operator):
+                return operator
+            case Variable(name):
+                return name
+            case Grouping(expression):
+                pending.append(expression)
+            case Ternary(cmp, left, right):
+                pending.extend((right, left, cmp))
+            case Literal():
+                pass
+    return Token(TokenType.EOF, "", None, 0, LineTable(""))
+
+
+class _Deopt(Exception):
+    """Raised by a specialized form when its operand type guard fails."""
+
+
+def _number_add(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Number(left.value + right.value)
+    raise _Deopt
+
+
+def _number_sub(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Number(left.value - right.value)
+    raise _Deopt
+
+
+def _number_mul(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Number(left.value * right.value)
+    raise _Deopt
+
+
+def _number_div(left: LoxType, right: LoxType) -> LoxType:
+    # division by 0 is left to the generic path, which reports it
+    if type(left) is Number and type(right) is Number and right.value != 0:
+        return Number(left.value / right.value)
+    raise _Deopt
+
+
+def _number_greater(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value > right.value)
+    raise _Deopt
+
+
+def _number_greater_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value >= right.value)
+    raise _Deopt
+
+
+def _number_less(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value < right.value)
+    raise _Deopt
+
+
+def _number_less_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value <= right.value)
+    raise _Deopt
+
+
+def _number_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value == right.value)
+    raise _Deopt
+
+
+def _number_not_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is Number and type(right) is Number:
+        return Bool(left.value != right.value)
+    raise _Deopt
+
+
+def _string_concat(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is String and type(right) is String:
+        return String(left.value + right.value)
+    raise _Deopt
+
+
+def _string_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is String and type(right) is String:
+        return Bool(left.value == right.value)
+    raise _Deopt
+
+
+def _string_not_equal(left: LoxType, right: LoxType) -> LoxType:
+    if type(left) is String and type(right) is String:
+        return Bool(left.value != right.value)
+    raise _Deopt
+
+
+_SPECIALIZATIONS: dict[
+    tuple[TokenType, type, type], Callable[[LoxType, LoxType], LoxType]
+] = {
+    (TokenType.PLUS, Number, Number): _number_add,
+    (TokenType.MINUS, Number, Number): _number_sub,
+    (TokenType.STAR, Number, Number): _number_mul,
+    (TokenType.SLASH, Number, Number): _number_div,
+    (TokenType.GREATER, Number, Number): _number_greater,
+    (TokenType.GREATER_EQUAL, Number, Number): _number_greater_equal,
+    (TokenType.LESS, Number, Number): _number_less,
+    (TokenType.LESS_EQUAL, Number, Number): _number_less_equal,
+    (TokenType.EQUAL_EQUAL, Number, Number): _number_equal,
+    (TokenType.BANG_EQUAL, Number, Number): _number_not_equal,
+    (TokenType.PLUS, String, String): _string_concat,
+    (TokenType.EQUAL_EQUAL, String, String): _string_equal,
+    (TokenType.BANG_EQUAL, String, String): _string_not_equal,
+}
+
+
 def _is_truthy(value: LoxType) -> bool:
     match value:
         case Bool(b):
@@ -110,7 +401,7 @@ def _is_equal(a: LoxType, b: LoxType) -> bool:
             return False
 
 
-def _stringify(value: LoxType) -> str:
+def stringify(value: LoxType) -> str:
     match value:
         case None:
             return "nil"
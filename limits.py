@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Limits:
+    """
+    Caps on the resources a single run may use. `None` means unlimited.
+    """
+
+    max_tokens: int | None = None
+    max_nodes: int | None = None
+    max_string_length: int | None = None
+
+
+# Number of steps charged between two checkpoints, where the deadline and
+# cancellation are checked.
+CLOCK_INTERVAL: int = 256
+
+# Number of tokens or nodes processed by the async APIs between two yields to
+# the event loop.
+YIELD_EVERY: int = 1024
+
+
+@dataclass(frozen=True)
+class Budget:
+    """
+    Bounds the work done by each phase of a run: at most `max_steps` loop
+    iterations or node evaluations, and at most `timeout` seconds of wall-clock
+    time. `None` means unbounded.
+    """
+
+    max_steps: int | None = None
+    timeout: float | None = None
+
+    def start(self) -> Meter | None:
+        if self.max_steps is None and self.timeout is None:
+            return None
+        return Meter(self)
+
+
+class Meter:
+    """
+    Charges steps against a started `Budget`. Steps are handed out in chunks so
+    that `charge` is a single decrement except at chunk boundaries, where the
+    step allowance, the deadline and cancellation are checked.
+    """
+
+    def __init__(self, budget: Budget) -> None:
+        self._remaining: int | None = budget.max_steps
+        self._deadline: float | None = (
+            None if budget.timeout is None else time.monotonic() + budget.timeout
+        )
+        self._countdown: int = 0
+        self._cancelled: bool = False
+        self._refill()
+
+    def charge(self) -> bool:
+        """
+        Charges one step and returns whether the budget is exhausted.
+        """
+        self._countdown -= 1
+        return self._countdown < 0 and self._checkpoint()
+
+    def cancel(self) -> None:
+        """
+        Exhausts the budget at the next checkpoint. Safe to call from any thread.
+        """
+        self._cancelled = True
+
+    def _checkpoint(self) -> bool:
+        if self._cancelled:
+            return True
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return True
+        if self._remaining == 0:
+            return True
+        self._refill()
+        self._countdown -= 1
+        return False
+
+    def _refill(self) -> None:
+        chunk = CLOCK_INTERVAL
+        if self._remaining is not None:
+            chunk = min(chunk, self._remaining)
+            self._remaining -= chunk
+        self._countdown = chunk
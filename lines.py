@@ -0,0 +1,60 @@
+import re
+from bisect import bisect_right
+
+
+# Number of characters shown on either side of a diagnostic's offset.
+SNIPPET_RADIUS: int = 40
+
+
+class LineTable:
+    """
+    Maps source offsets to 1-based line and column numbers. The table of line
+    start offsets is only built the first time a position is asked for.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source: str = source
+        self._starts: list[int] | None = None
+
+    @property
+    def starts(self) -> list[int]:
+        if self._starts is None:
+            # only the offsets are kept, not a copy of every line
+            newlines = re.finditer("\n", self.source)
+            self._starts = [0, *(newline.end() for newline in newlines)]
+        return self._starts
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self.starts, offset)
+
+    def column(self, offset: int) -> int:
+        return offset - self.starts[self.line(offset) - 1] + 1
+
+    def text(self, line: int) -> str:
+        starts = self.starts
+        start = starts[line - 1]
+        end = starts[line] - 1 if line < len(starts) else len(self.source)
+        return self.source[start:end]
+
+    def snippet(self, offset: int, length: int = 1) -> str:
+        """
+        Renders the line holding `offset` with carets under `length` characters.
+        Long lines are clipped to `SNIPPET_RADIUS` characters around `offset`.
+        """
+        starts = self.starts
+        line = bisect_right(starts, offset)
+        start = starts[line - 1]
+        end = starts[line] - 1 if line < len(starts) else len(self.source)
+        if start == end:
+            return ""
+        low = max(start, offset - SNIPPET_RADIUS)
+        high = min(end, offset + SNIPPET_RADIUS)
+        text = self.source[low:high]
+        # keep tabs so the carets line up with the text above them
+        indent = "".join(c if c == "\t" else " " for c in text[: offset - low])
+        if low > start:
+            text, indent = f"…{text}", f" {indent}"
+        if high < end:
+            text = f"{text}…"
+        width = max(1, min(length, high - offset))
+        return f"    {text}\n    {indent}{'^' * width}"
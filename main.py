@@ -1,52 +1,120 @@
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from error import Error
+from typing import NoReturn
+from error import MAX_ERRORS, Error
 import sys
 
-from interpreter import Interpreter
-from parser import Parser
-from scanner import Scanner
+import pipeline
+from interpreter import Interpreter, stringify
+from limits import Budget, Limits
+from memreport import MemoryTracker
+
+
+class _ArgumentParser(ArgumentParser):
+    def error(self, message: str) -> NoReturn:
+        self.print_usage(sys.stdout)
+        sys.exit(64)
 
 
 def main() -> None:
-    interpreter = Interpreter()
-    match sys.argv[1:]:
-        case []:
-            run_prompt(interpreter)
-        case [path]:
-            run_file(interpreter, Path(path))
-        case [*_args]:
-            print("Usage: pylox [script]")
-            sys.exit(64)
-
-
-def run_prompt(interpreter: Interpreter):
+    args = _parse_args(sys.argv[1:])
+    limits = Limits(args.max_tokens, args.max_nodes, args.max_string_length)
+    budget = Budget(args.max_steps, args.timeout)
+    interpreter = Interpreter(limits, budget)
+    match args.script:
+        case None:
+            run_prompt(interpreter, args.memory_report, args.max_errors)
+        case path:
+            run_file(
+                interpreter,
+                Path(path),
+                args.memory_report,
+                args.scan_workers,
+                args.max_errors,
+            )
+
+
+def _parse_args(argv: list[str]) -> Namespace:
+    parser = _ArgumentParser(prog="pylox", add_help=False)
+    parser.add_argument("script", nargs="?")
+    parser.add_argument("--memory-report", action="store_true")
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--max-nodes", type=int)
+    parser.add_argument("--max-string-length", type=int)
+    parser.add_argument("--max-steps", type=int)
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--scan-workers", type=int)
+    parser.add_argument("--max-errors", type=int, default=MAX_ERRORS)
+    return parser.parse_args(argv)
+
+
+def run_prompt(
+    interpreter: Interpreter,
+    memory_report: bool = False,
+    max_errors: int | None = MAX_ERRORS,
+):
     while True:
         try:
             line = input("> ")
-            run(interpreter, line)
-            Error.had_error = False
+            with MemoryTracker(memory_report) as tracker:
+                run(interpreter, line, Error(max_errors=max_errors), tracker)
+            if memory_report:
+                print(tracker.report(), file=sys.stderr)
         except EOFError:
             break
 
 
-def run_file(interpreter: Interpreter, file: Path) -> None:
+def run_file(
+    interpreter: Interpreter,
+    file: Path,
+    memory_report: bool = False,
+    scan_workers: int | None = None,
+    max_errors: int | None = MAX_ERRORS,
+) -> None:
     with open(file, "rb") as f:
         contents = f.read()
-        run(interpreter, contents.decode())
-        if Error.had_error:
+        errors = Error(max_errors=max_errors)
+        with MemoryTracker(memory_report) as tracker:
+            # undecodable bytes become U+FFFD and are reported by the scanner
+            source = contents.decode(errors="replace")
+            run(interpreter, source, errors, tracker, scan_workers)
+        if memory_report:
+            print(tracker.report(), file=sys.stderr)
+        if errors.had_error:
             sys.exit(65)
-        elif Error.had_runtime_error:
+        elif errors.had_runtime_error:
             sys.exit(70)
 
 
-def run(interpreter: Interpreter, source: str) -> None:
-    scanner = Scanner(source)
-    tokens = scanner.scan_tokens()
-    parser = Parser(tokens)
-    expression = parser.parse()
-    if expression is None:
-        return
-    interpreter.interpret(expression)
+def run(
+    interpreter: Interpreter,
+    source: str,
+    errors: Error,
+    tracker: MemoryTracker = MemoryTracker(enabled=False),
+    scan_workers: int | None = None,
+) -> None:
+    try:
+        evaluation = pipeline.evaluate(
+            source, errors, interpreter, tracker, scan_workers
+        )
+    finally:
+        errors.flush()
+    if evaluation is not None:
+        print(stringify(evaluation.value))
+
+
+async def run_async(interpreter: Interpreter, source: str, errors: Error) -> None:
+    """
+    Like `run`, but gives the event loop a turn while scanning, parsing and
+    evaluating. Nothing is reported or printed until the run completes, so
+    cancelling it discards the run and leaves `errors` untouched.
+    """
+    pending = errors.fork()
+    evaluation = await pipeline.evaluate_async(source, pending, interpreter)
+    errors.merge(pending)
+    errors.flush()
+    if evaluation is not None:
+        print(stringify(evaluation.value))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass
+class Phase:
+    name: str
+    unit: str | None = None
+    items: int = 0
+    peak_bytes: int = 0
+    retained_bytes: int = 0
+
+
+class MemoryTracker:
+    """
+    Measures the memory used by each phase of a run with `tracemalloc`.
+    A disabled tracker measures nothing, so callers can use it unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled: bool = enabled
+        self.phases: list[Phase] = []
+        self._started: bool = False
+
+    def __enter__(self) -> "MemoryTracker":
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    @contextmanager
+    def phase(self, name: str, unit: str | None = None) -> Iterator[Phase]:
+        phase = Phase(name, unit)
+        if not self.enabled or not tracemalloc.is_tracing():
+            yield phase
+            return
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        try:
+            yield phase
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            phase.peak_bytes = peak - base
+            phase.retained_bytes = current - base
+            self.phases.append(phase)
+
+    def report(self) -> str:
+        lines = []
+        for phase in self.phases:
+            line = f"[memory] {phase.name}: peak {phase.peak_bytes} bytes"
+            if phase.unit is not None:
+                retained = phase.retained_bytes / phase.items if phase.items else 0
+                line += f", {phase.items} {phase.unit}s"
+                line += f", {retained:.1f} bytes/{phase.unit}"
+            lines.append(line)
+        return "\n".join(lines)
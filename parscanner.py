@@ -0,0 +1,266 @@
+import re
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+from error import Error
+from langtypes import LoxType, Number, String
+from limits import Budget, Limits
+from lines import LineTable
+from scanner import Scanner
+from tokens import Token, TokenType
+
+
+# Target number of characters per chunk. Sources shorter than this are scanned
+# serially.
+CHUNK_SIZE: int = 1 << 22
+
+# Strings and comments are matched whole so that only newlines outside of them
+# are offered as chunk boundaries.
+_SIGNIFICANT = re.compile(r'"[^"]*"?|//[^\n]*|\n')
+
+# The source is shared with the workers as UTF-32 so that character offsets map
+# to byte offsets directly.
+_ENCODING = "utf-32-le"
+_CHAR_SIZE = 4
+
+_TOKEN_TYPES: dict[int, TokenType] = {t.value: t for t in TokenType}
+
+# A token column entry: one byte of type, then its start and end offsets.
+_TOKEN_SIZE = 1 + 8 + 8
+
+
+@dataclass(frozen=True)
+class _Record:
+    offset: int
+    length: int
+    message: str
+    # where the scanner was when it reported, and stopped if this was its last
+    stop: int
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    columns: str
+    count: int
+    records: list[_Record]
+    halted: bool
+    stop: int
+
+
+class _Recorder(Error):
+    """
+    Keeps a worker's diagnostics so the parent can report them at their
+    offsets in the whole source.
+    """
+
+    def __init__(self, max_errors: int | None) -> None:
+        super().__init__(max_errors=max_errors)
+        self.scanner: Scanner | None = None
+        self.records: list[_Record] = []
+
+    def error(
+        self, lines: LineTable, offset: int, message: str, length: int = 1
+    ) -> None:
+        super().error(lines, offset, message, length)
+        assert self.scanner is not None
+        self.records.append(_Record(offset, length, message, self.scanner.current))
+
+
+class ParallelScanner:
+    """
+    Scans large sources on a process pool. The source is split after newlines
+    that are outside of string literals, each chunk is scanned by a `Scanner`
+    in a worker, and the results are stitched back together. Tokens and
+    diagnostics are the same as the serial scanner's. Sources that fit in one
+    chunk, and runs with a bounded `budget`, are scanned serially.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        errors: Error,
+        limits: Limits = Limits(),
+        budget: Budget = Budget(),
+        workers: int | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        self.source: str = source
+        self.errors: Error = errors
+        self.limits: Limits = limits
+        self.budget: Budget = budget
+        self.workers: int | None = workers
+        self.chunk_size: int = chunk_size
+        self.tokens: list[Token] = []
+        self.current: int = 0
+        self.lines: LineTable = LineTable(source)
+        self.halted: bool = False
+
+    def scan_tokens(self) -> list[Token]:
+        bounds = chunk_bounds(self.source, self.chunk_size)
+        if len(bounds) <= 2 or self.budget.start() is not None:
+            # a budget bounds the steps of the whole phase, which only the
+            # serial scanner can charge in the same order
+            scanner = Scanner(self.source, self.errors, self.limits, self.budget)
+            self.tokens = scanner.scan_tokens()
+            self.halted = scanner.halted
+            return self.tokens
+
+        futures: list[Future[_Chunk]] = []
+        try:
+            shared = SharedMemory(create=True, size=len(self.source) * _CHAR_SIZE)
+            try:
+                for start, end in zip(bounds, bounds[1:]):
+                    encoded = self.source[start:end].encode(_ENCODING)
+                    shared.buf[start * _CHAR_SIZE : end * _CHAR_SIZE] = encoded
+                max_errors = self.errors.max_errors
+                # leaving the pool waits for every submitted chunk
+                with ProcessPoolExecutor(self.workers) as pool:
+                    for start, end in zip(bounds, bounds[1:]):
+                        futures.append(
+                            pool.submit(
+                                _scan_chunk,
+                                shared.name,
+                                start,
+                                end,
+                                self.limits,
+                                max_errors,
+                            )
+                        )
+            finally:
+                shared.close()
+                shared.unlink()
+
+            chunks = [future.result() for future in futures]
+            self.current = len(self.source)
+            for base, chunk in zip(bounds, chunks):
+                if self.halted:
+                    break
+                self._stitch(base, chunk)
+        finally:
+            for future in futures:
+                _release(future)
+        self.tokens.append(Token(TokenType.EOF, "", None, self.current, self.lines))
+        return self.tokens
+
+    def _stitch(self, base: int, chunk: _Chunk) -> None:
+        columns = SharedMemory(chunk.columns)
+        try:
+            self._stitch_columns(base, chunk, columns)
+        finally:
+            columns.close()
+
+    def _stitch_columns(
+        self, base: int, chunk: _Chunk, columns: SharedMemory
+    ) -> None:
+        count = chunk.count
+        types, starts, ends = array("B"), array("q"), array("q")
+        types.frombytes(columns.buf[:count])
+        starts.frombytes(columns.buf[count : count * 9])
+        ends.frombytes(columns.buf[count * 9 : count * _TOKEN_SIZE])
+
+        cut = count
+        max_tokens = self.limits.max_tokens
+        if max_tokens is not None and len(self.tokens) + count > max_tokens:
+            # the serial scanner would have stopped at this chunk's
+            # (max_tokens - len(self.tokens))th token
+            cut = max_tokens - len(self.tokens)
+        cut_offset = starts[cut] if cut < count else None
+
+        for record in chunk.records:
+            if cut_offset is not None and record.offset >= cut_offset:
+                break
+            self.errors.error(
+                self.lines, base + record.offset, record.message, record.length
+            )
+            if self.errors.exhausted:
+                # the serial scanner stops right after this diagnostic
+                stop = bisect_left(starts, record.offset)
+                self._append(base, types, starts, ends, stop)
+                self.halted = True
+                self.current = base + record.stop
+                return
+
+        self._append(base, types, starts, ends, cut)
+        if cut_offset is not None:
+            # same diagnostic as Scanner.add_token
+            message = f"too many tokens (limit {max_tokens})"
+            self.errors.error(self.lines, base + cut_offset, message)
+            self.halted = True
+            self.current = base + ends[cut]
+        elif chunk.halted:
+            self.halted = True
+            self.current = base + chunk.stop
+
+    def _append(
+        self, base: int, types: array, starts: array, ends: array, stop: int
+    ) -> None:
+        source, lines = self.source, self.lines
+        for i in range(stop):
+            start, end = base + starts[i], base + ends[i]
+            token_type = _TOKEN_TYPES[types[i]]
+            lexeme = source[start:end]
+            literal: LoxType = None
+            if token_type is TokenType.NUMBER:
+                literal = Number(float(lexeme))
+            elif token_type is TokenType.STRING:
+                literal = String(lexeme[1:-1])
+            self.tokens.append(Token(token_type, lexeme, literal, start, lines))
+
+
+def chunk_bounds(source: str, chunk_size: int) -> list[int]:
+    """
+    Returns the offsets at which `source` can be split into chunks of at least
+    `chunk_size` characters, starting with 0 and ending with `len(source)`.
+    Every inner offset follows a newline that is not inside a string literal.
+    """
+    bounds = [0]
+    for match in _SIGNIFICANT.finditer(source):
+        if match.group() != "\n":
+            continue
+        end = match.end()
+        if end - bounds[-1] >= chunk_size:
+            bounds.append(end)
+    if bounds[-1] != len(source):
+        bounds.append(len(source))
+    return bounds
+
+
+def _release(future: Future[_Chunk]) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    columns = SharedMemory(future.result().columns)
+    columns.close()
+    columns.unlink()
+
+
+def _scan_chunk(
+    name: str, start: int, end: int, limits: Limits, max_errors: int | None
+) -> _Chunk:
+    shared = SharedMemory(name)
+    try:
+        with shared.buf[start * _CHAR_SIZE : end * _CHAR_SIZE] as view:
+            text = str(view, _ENCODING)
+    finally:
+        shared.close()
+
+    recorder = _Recorder(max_errors)
+    scanner = recorder.scanner = Scanner(text, recorder, limits)
+    tokens = scanner.scan_tokens()[:-1]
+    count = len(tokens)
+    types = array("B", [token.type.value for token in tokens])
+    starts = array("q", [token.offset for token in tokens])
+    ends = array("q", [token.offset + len(token.lexeme) for token in tokens])
+
+    columns = SharedMemory(create=True, size=max(1, count * _TOKEN_SIZE))
+    try:
+        columns.buf[:count] = types
+        columns.buf[count : count * 9] = memoryview(starts).cast("B")
+        columns.buf[count * 9 : count * _TOKEN_SIZE] = memoryview(ends).cast("B")
+    finally:
+        columns.close()
+    return _Chunk(
+        columns.name, count, recorder.records, scanner.halted, scanner.current
+    )
@@ -1,6 +1,9 @@
-from error import Error
-from expr import Binary, Expr, Grouping, Literal, Ternary, Unary
+import asyncio
+
+from error import BudgetExceeded, Error
+from expr import Binary, Expr, Grouping, Literal, Ternary, Unary, Variable
 from langtypes import Bool
+from limits import Budget, Limits, Meter
 from tokens import Token, TokenType
 
 
@@ -33,12 +36,23 @@ class Parser:
                    | primary ;
 
     primary        → NUMBER | STRING | "true" | "false" | "nil"
-                   | "(" expression ")" ;
+                   | IDENTIFIER | "(" expression ")" ;
     """
 
-    def __init__(self, tokens: list[Token]) -> None:
+    def __init__(
+        self,
+        tokens: list[Token],
+        errors: Error,
+        limits: Limits = Limits(),
+        budget: Budget = Budget(),
+    ) -> None:
         self._tokens: list[Token] = tokens
+        self._errors: Error = errors
+        self._limits: Limits = limits
+        self._budget: Budget = budget
+        self._meter: Meter | None = budget.start()
         self._current: int = 0
+        self.node_count: int = 0
 
     def parse(self) -> Expr | None:
         try:
@@ -46,12 +60,49 @@ class Parser:
         except ParseError:
             return None
 
+    def parse_complete(self) -> Expr | None:
+        """
+        Like `parse`, but reports any tokens left over after the expression.
+        """
+        expr = self.parse()
+        if expr is not None and not self._is_at_end():
+            try:
+                self._report(self._peek(), "Expect end of expression.")
+            except ParseError:
+                pass
+            return None
+        return expr
+
+    async def parse_async(self) -> Expr | None:
+        """
+        Parses on a worker thread so the event loop stays responsive. The parser
+        is recursive, so instead of yielding it is cancelled through its meter.
+        The thread may outlive a cancelled task, so it reports into a fork of
+        the error context that is merged back only once it has finished.
+        """
+        meter = self._meter = self._meter or Meter(self._budget)
+        errors, self._errors = self._errors, self._errors.fork()
+        try:
+            expr = await asyncio.to_thread(self.parse)
+        except asyncio.CancelledError:
+            meter.cancel()
+            raise
+        except BudgetExceeded:
+            self._join(errors)
+            raise
+        self._join(errors)
+        return expr
+
+    def _join(self, errors: Error) -> None:
+        errors.merge(self._errors)
+        self._errors = errors
+
     def _comma(self) -> Expr:
         left = self._ternary()
         while self._match(TokenType.COMMA):
             operator = self._previous()
             right = self._ternary()
-            left = Binary(left, operator, right)
+            left = self._node(Binary(left, operator, right))
         return left
 
     def _ternary(self) -> Expr:
@@ -61,7 +112,7 @@ class Parser:
             left = self._ternary()
             self._consume(TokenType.COLON, "Expect ':' after expression")
             right = self._ternary()
-            return Ternary(expr, left, right)
+            return self._node(Ternary(expr, left, right))
         else:
             return expr
 
@@ -72,17 +123,17 @@ class Parser:
         ops = TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL
         if self._match(*ops):
             # error production
-            Error.parse_error(
+            self._report(
                 self._previous(), "expected left hand operand, found none"
             )
             _right = self._equality()
-            return Literal(None)
+            return self._node(Literal(None))
         else:
             expr = self._comparison()
             while self._match(*ops):
                 operator = self._previous()
                 right = self._comparison()
-                expr = Binary(expr, operator, right)
+                expr = self._node(Binary(expr, operator, right))
             return expr
 
     def _comparison(self) -> Expr:
@@ -94,45 +145,45 @@ class Parser:
         )
         if self._match(*ops):
             # error production
-            Error.parse_error(
+            self._report(
                 self._previous(), "expected left hand operand, found none"
             )
             _right = self._comparison()
-            return Literal(None)
+            return self._node(Literal(None))
         else:
             left = self._term()
             while self._match(*ops):
                 operator = self._previous()
                 right = self._term()
-                left = Binary(left, operator, right)
+                left = self._node(Binary(left, operator, right))
             return left
 
     def _term(self) -> Expr:
         # We only match on Plus here since Minus is a valid unary operator
         if self._match(TokenType.PLUS):
             # error production
-            Error.parse_error(
+            self._report(
                 self._previous(), "expected left hand operand, found none"
             )
             _right = self._comparison()
-            return Literal(None)
+            return self._node(Literal(None))
         else:
             left = self._factor()
             while self._match(TokenType.MINUS, TokenType.PLUS):
                 operator = self._previous()
                 right = self._factor()
-                left = Binary(left, operator, right)
+                left = self._node(Binary(left, operator, right))
             return left
 
     def _factor(self) -> Expr:
         ops = (TokenType.STAR, TokenType.SLASH)
         if self._match(*ops):
             # error production
-            Error.parse_error(
+            self._report(
                 self._previous(), "expected left hand operand, found none"
             )
             _right = self._comparison()
-            return Literal(None)
+            return self._node(Literal(None))
         else:
             left = self._unary()
             while self._match(
@@ -141,33 +192,44 @@ class Parser:
             ):
                 operator = self._previous()
                 right = self._unary()
-                left = Binary(left, operator, right)
+                left = self._node(Binary(left, operator, right))
             return left
 
     def _unary(self) -> Expr:
         if self._match(TokenType.BANG, TokenType.MINUS):
             operator = self._previous()
             right = self._unary()
-            return Unary(operator, right)
+            return self._node(Unary(operator, right))
         else:
             return self._primary()
 
     def _primary(self) -> Expr:
         if self._match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self._previous().literal)
+            return self._node(Literal(self._previous().literal))
         elif self._match(TokenType.FALSE):
-            return Literal(Bool(False))
+            return self._node(Literal(Bool(False)))
         elif self._match(TokenType.TRUE):
-            return Literal(Bool(True))
+            return self._node(Literal(Bool(True)))
         elif self._match(TokenType.NIL):
-            return Literal(None)
+            return self._node(Literal(None))
+        elif self._match(TokenType.IDENTIFIER):
+            return self._node(Variable(self._previous()))
         elif self._match(TokenType.LEFT_PAREN):
             expr = self._expression()
             self._consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
-            return Grouping(expr)
+            return self._node(Grouping(expr))
         else:
             raise self._error(self._peek(), "Expect expression.")
 
+    def _node[E: Expr](self, node: E) -> E:
+        self.node_count += 1
+        max_nodes = self._limits.max_nodes
+        if max_nodes is not None and self.node_count > max_nodes:
+            raise self._error(
+                self._previous(), f"too many expression nodes (limit {max_nodes})"
+            )
+        return node
+
     def _match(self, *args: TokenType) -> bool:
         for token in args:
             if self._check(token):
@@ -181,6 +243,8 @@ class Parser:
         return self._peek().type == token_type
 
     def _advance(self) -> Token:
+        if self._meter is not None and self._meter.charge():
+            raise BudgetExceeded(self._peek())
         if not self._is_at_end():
             self._current += 1
         return self._previous()
@@ -200,9 +264,14 @@ class Parser:
         raise self._error(self._peek(), message)
 
     def _error(self, token: Token, message: str) -> ParseError:
-        Error.parse_error(token, message)
+        self._report(token, message)
         return ParseError()
 
+    def _report(self, token: Token, message: str) -> None:
+        self._errors.parse_error(token, message)
+        if self._errors.exhausted:
+            raise ParseError()
+
     def _synchronize(self) -> None:
         self._advance()
 
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+from error import Error, RuntimeErr
+from expr import Expr
+from interpreter import Interpreter
+from langtypes import LoxType
+from limits import Budget, Limits
+from memreport import MemoryTracker
+from parscanner import ParallelScanner
+from parser import Parser
+from scanner import Scanner
+
+
+@dataclass(frozen=True)
+class Evaluation:
+    value: LoxType
+
+
+def parse(
+    source: str,
+    errors: Error,
+    limits: Limits = Limits(),
+    budget: Budget = Budget(),
+    tracker: MemoryTracker = MemoryTracker(enabled=False),
+    scan_workers: int | None = None,
+    complete: bool = False,
+) -> Expr | None:
+    """
+    Scans and parses `source`, reporting into `errors`. Returns `None` if
+    scanning halted or no expression could be parsed. `complete` rejects
+    tokens left over after the expression. Raises `BudgetExceeded`.
+    """
+    with tracker.phase("scan", "token") as phase:
+        scanner = (
+            Scanner(source, errors, limits, budget)
+            if scan_workers is None
+            else ParallelScanner(source, errors, limits, budget, scan_workers)
+        )
+        tokens = scanner.scan_tokens()
+        phase.items = len(tokens)
+    if scanner.halted:
+        return None
+    with tracker.phase("parse", "node") as phase:
+        parser = Parser(tokens, errors, limits, budget)
+        expression = parser.parse_complete() if complete else parser.parse()
+        phase.items = parser.node_count
+    return expression
+
+
+async def parse_async(
+    source: str, errors: Error, limits: Limits = Limits(), budget: Budget = Budget()
+) -> Expr | None:
+    """
+    Like `parse`, but gives the event loop a turn while scanning and parsing.
+    """
+    scanner = Scanner(source, errors, limits, budget)
+    tokens = await scanner.scan_tokens_async()
+    if scanner.halted:
+        return None
+    return await Parser(tokens, errors, limits, budget).parse_async()
+
+
+def evaluate(
+    source: str,
+    errors: Error,
+    interpreter: Interpreter,
+    tracker: MemoryTracker = MemoryTracker(enabled=False),
+    scan_workers: int | None = None,
+) -> Evaluation | None:
+    """
+    Scans, parses and evaluates `source` with `interpreter`, reporting every
+    diagnostic, runtime errors included, into `errors`. Returns `None` if the
+    run stopped before producing a value. Nothing is flushed or printed.
+    """
+    limits, budget = interpreter.limits, interpreter.budget
+    try:
+        expression = parse(source, errors, limits, budget, tracker, scan_workers)
+        if expression is None:
+            return None
+        with tracker.phase("evaluate"):
+            return Evaluation(interpreter.evaluate(expression))
+    except RuntimeErr as err:
+        errors.runtime_error(err)
+        return None
+
+
+async def evaluate_async(
+    source: str, errors: Error, interpreter: Interpreter
+) -> Evaluation | None:
+    """
+    Like `evaluate`, but gives the event loop a turn in every phase.
+    """
+    limits, budget = interpreter.limits, interpreter.budget
+    try:
+        expression = await parse_async(source, errors, limits, budget)
+        if expression is None:
+            return None
+        return Evaluation(await interpreter.evaluate_async(expression))
+    except RuntimeErr as err:
+        errors.runtime_error(err)
+        return None
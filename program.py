@@ -0,0 +1,87 @@
+import io
+from dataclasses import dataclass
+
+import pipeline
+from error import BudgetExceeded, Error
+from expr import Binary, Expr, Grouping, Ternary, Unary, Variable
+from interpreter import Interpreter
+from langtypes import Bool, LoxType, Number, String
+from limits import Budget, Limits
+
+
+class CompileError(Exception):
+    def __init__(self, diagnostics: str) -> None:
+        super().__init__(diagnostics)
+        self.diagnostics: str = diagnostics
+
+
+@dataclass(frozen=True)
+class Program:
+    """
+    An expression parsed once and evaluated any number of times, with its
+    identifiers bound to the keyword arguments of `evaluate`.
+    """
+
+    expr: Expr
+    parameters: frozenset[str]
+    limits: Limits = Limits()
+    budget: Budget = Budget()
+
+    def evaluate(self, **bindings: object) -> LoxType:
+        """
+        Returns the value of the expression, or raises `RuntimeErr`.
+        """
+        values = {name: _to_lox(name, value) for name, value in bindings.items()}
+        return Interpreter(self.limits, self.budget).evaluate(self.expr, values)
+
+
+def compile_expr(
+    source: str, limits: Limits = Limits(), budget: Budget = Budget()
+) -> Program:
+    """
+    Scans and parses `source`, raising `CompileError` with the diagnostics if
+    it is not a valid expression.
+    """
+    out = io.StringIO()
+    errors = Error(out)
+    expr = None
+    try:
+        expr = pipeline.parse(source, errors, limits, budget, complete=True)
+    except BudgetExceeded as err:
+        errors.runtime_error(err)
+    if expr is None or errors.had_error or errors.had_runtime_error:
+        errors.flush()
+        raise CompileError(out.getvalue())
+    return Program(expr, _parameters(expr), limits, budget)
+
+
+def _parameters(expr: Expr) -> frozenset[str]:
+    names = set()
+    pending = [expr]
+    while pending:
+        match pending.pop():
+            case Variable(name):
+                names.add(name.lexeme)
+            case Binary(left, _, right):
+                pending += left, right
+            case Ternary(cmp, left, right):
+                pending += cmp, left, right
+            case Unary(_, right):
+                pending.append(right)
+            case Grouping(expression):
+                pending.append(expression)
+    return frozenset(names)
+
+
+def _to_lox(name: str, value: object) -> LoxType:
+    match value:
+        case None | Bool() | Number() | String():
+            return value
+        case bool():
+            return Bool(value)
+        case int() | float():
+            return Number(float(value))
+        case str():
+            return String(value)
+        case _:
+            raise TypeError(f"can't bind '{name}' to {type(value).__name__}")
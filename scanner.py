@@ -1,5 +1,10 @@
-from error import Error
+import asyncio
+import re
+
+from error import BudgetExceeded, Error
 from langtypes import LoxType, Number, String
+from lines import LineTable
+from limits import YIELD_EVERY, Budget, Limits
 from tokens import Token, TokenType
 
 
@@ -22,22 +27,68 @@ KEYWORDS: dict[str, TokenType] = {
     "while": TokenType.WHILE,
 }
 
+# Characters that can't start any token, matched in runs by Scanner.unexpected.
+UNEXPECTED = re.compile(r'[^(){},.\-+;*?:!=<>/" \r\t\nA-Za-z0-9_]*')
+
+
+class ScanError(RuntimeError):
+    pass
+
 
 class Scanner:
-    def __init__(self, source: str) -> None:
+    def __init__(
+        self,
+        source: str,
+        errors: Error,
+        limits: Limits = Limits(),
+        budget: Budget = Budget(),
+    ) -> None:
         self.source: str = source
+        self.errors: Error = errors
+        self.limits: Limits = limits
+        self.budget: Budget = budget
         self.tokens: list[Token] = []
         self.start: int = 0
         self.current: int = 0
-        self.line: int = 1
+        self.lines: LineTable = LineTable(source)
+        self.halted: bool = False
 
     def scan_tokens(self) -> list[Token]:
-        while not self.is_at_end():
-            self.start = self.current
-            self.scan_token()
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        meter = self.budget.start()
+        try:
+            while not self.is_at_end():
+                if meter is not None and meter.charge():
+                    raise self.budget_exceeded()
+                self.start = self.current
+                self.scan_token()
+        except ScanError:
+            self.halted = True
+        return self.finish()
+
+    async def scan_tokens_async(self, yield_every: int = YIELD_EVERY) -> list[Token]:
+        meter = self.budget.start()
+        countdown = yield_every
+        try:
+            while not self.is_at_end():
+                if meter is not None and meter.charge():
+                    raise self.budget_exceeded()
+                self.start = self.current
+                self.scan_token()
+                countdown -= 1
+                if countdown == 0:
+                    countdown = yield_every
+                    await asyncio.sleep(0)
+        except ScanError:
+            self.halted = True
+        return self.finish()
+
+    def finish(self) -> list[Token]:
+        self.tokens.append(Token(TokenType.EOF, "", None, self.current, self.lines))
         return self.tokens
 
+    def budget_exceeded(self) -> BudgetExceeded:
+        return BudgetExceeded(Token(TokenType.EOF, "", None, self.current, self.lines))
+
     def scan_token(self):
         c = self.advance()
         match c:
@@ -102,30 +153,48 @@ class Scanner:
             # identifiers
             case a if is_alpha(a):
                 self.identifier()
-            case "\n":
-                self.line += 1
             # meaningless characters:
-            case " " | "\r" | "\t":
+            case " " | "\r" | "\t" | "\n":
                 pass
             case _:
-                Error.error(self.line, "Unexpected character")
+                self.unexpected()
+
+    def unexpected(self) -> None:
+        # report a run of unexpected characters as a single diagnostic
+        self.current = UNEXPECTED.match(self.source, self.current).end()
+        length = self.current - self.start
+        message = "Unexpected character" if length == 1 else "Unexpected characters"
+        self.errors.error(self.lines, self.start, message, length)
+        if self.errors.exhausted:
+            raise ScanError()
 
     def add_token(self, token_type: TokenType, literal: LoxType = None) -> None:
+        max_tokens = self.limits.max_tokens
+        if max_tokens is not None and len(self.tokens) >= max_tokens:
+            raise self.error(f"too many tokens (limit {max_tokens})")
         token = Token(
-            token_type, self.source[self.start : self.current], literal, self.line
+            token_type,
+            self.source[self.start : self.current],
+            literal,
+            self.start,
+            self.lines,
         )
         self.tokens.append(token)
 
     def string(self) -> None:
         while not self.is_at_end() and self.peek() != '"':
-            c = self.advance()
-            if c == "\n":
-                self.line += 1
+            self.advance()
 
         if self.is_at_end():
-            Error.error(self.line, "Unterminated string")
+            self.errors.error(self.lines, self.start, "Unterminated string")
+            if self.errors.exhausted:
+                raise ScanError()
             return
 
+        max_length = self.limits.max_string_length
+        if max_length is not None and self.current - self.start - 1 > max_length:
+            raise self.error(f"string literal too long (limit {max_length})")
+
         # consume "
         self.advance()
         literal = self.source[self.start + 1 : self.current - 1]
@@ -181,6 +250,10 @@ class Scanner:
     def is_at_end(self) -> bool:
         return self.current >= len(self.source)
 
+    def error(self, message: str) -> ScanError:
+        self.errors.error(self.lines, self.start, message)
+        return ScanError()
+
 
 def is_digit(d: str) -> bool:
     match d:
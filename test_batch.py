@@ -0,0 +1,36 @@
+import pytest
+
+from batch import evaluate, evaluate_many
+from limits import Limits
+
+
+SOURCES = [
+    "1 + 2 * 3",
+    '"con" + "cat"',
+    '"a" - 1',
+    "1 +",
+    "== 3",
+    "4 / 0",
+    "@ 1",
+    "-true",
+    "true ? 1 : 2",
+    '"abc" + "defgh"',
+]
+
+
+@pytest.mark.parametrize("workers", [2, 8])
+def test_evaluate_many_keeps_runs_apart(workers):
+    limits = Limits(max_string_length=6)
+    sources = SOURCES * 50
+    expected = [evaluate(source, limits) for source in SOURCES] * 50
+    assert evaluate_many(sources, workers, limits) == expected
+
+
+def test_results_carry_their_own_diagnostics():
+    good, runtime, parse = evaluate_many(['"a" + "b"', "-nil", "(1"], 3)
+    assert not good.had_error and not good.had_runtime_error
+    assert good.diagnostics == ""
+    assert runtime.had_runtime_error and not runtime.had_error
+    assert "-nil" in runtime.diagnostics
+    assert parse.had_error and not parse.had_runtime_error
+    assert "Expect ')' after expression." in parse.diagnostics
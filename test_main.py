@@ -0,0 +1,94 @@
+import asyncio
+import io
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from error import Error
+from interpreter import Interpreter
+from main import run_async
+from parser import Parser
+from scanner import Scanner
+
+
+MAIN = Path(__file__).with_name("main.py")
+
+
+def test_binary_input_output_is_bounded(tmp_path):
+    rng = random.Random(0)
+    # a large file without newlines, so no diagnostic gets a short line
+    contents = bytes(rng.choice(range(11, 256)) for _ in range(1 << 20))
+    script = tmp_path / "binary.lox"
+    script.write_bytes(contents)
+    result = subprocess.run(
+        [sys.executable, MAIN, script], capture_output=True, timeout=60
+    )
+    assert result.returncode == 65
+    # at most MAX_ERRORS clipped snippets and the summary
+    assert len(result.stdout) < 64 * 1024
+
+
+def _balanced(depth):
+    if depth == 0:
+        return "1"
+    half = _balanced(depth - 1)
+    return f"({half} + {half})"
+
+
+async def _cancel_after(coroutine, turns):
+    task = asyncio.create_task(coroutine)
+    for _ in range(turns):
+        await asyncio.sleep(0)
+    if task.done():
+        return False
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        return True
+    return False
+
+
+def test_cancelled_run_async_leaves_nothing_behind(monkeypatch, capsys):
+    phases = []
+
+    def entering(phase, method):
+        def wrapper(*args, **kwargs):
+            phases.append(phase)
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        Scanner, "scan_tokens_async", entering("scan", Scanner.scan_tokens_async)
+    )
+    monkeypatch.setattr(Parser, "parse_async", entering("parse", Parser.parse_async))
+    monkeypatch.setattr(
+        Interpreter,
+        "evaluate_async",
+        entering("evaluate", Interpreter.evaluate_async),
+    )
+    # a scan error, a parse error, and enough work in every phase to yield
+    source = "@ == 1, " + _balanced(11)
+
+    cancelled_in = set()
+    turns = 0
+    while True:
+        out = io.StringIO()
+        errors = Error(out)
+        phases.clear()
+        run = run_async(Interpreter(), source, errors)
+        if not asyncio.run(_cancel_after(run, turns)):
+            break
+        cancelled_in.add(phases[-1] if phases else "start")
+        assert out.getvalue() == ""
+        assert capsys.readouterr().out == ""
+        assert errors.diagnostics == []
+        assert not errors.had_error and not errors.had_runtime_error
+        turns += 1
+
+    assert cancelled_in == {"start", "scan", "parse", "evaluate"}
+    assert errors.had_error
+    assert "Unexpected character" in out.getvalue()
+    assert capsys.readouterr().out.strip() == "2048"
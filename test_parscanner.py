@@ -0,0 +1,77 @@
+import io
+import random
+
+import pytest
+
+from error import BudgetExceeded, Error
+from limits import Budget, Limits
+from parscanner import ParallelScanner
+from scanner import Scanner
+
+
+# Fragments chosen to put chunk boundaries next to strings, comments, line
+# breaks and bad characters.
+FRAGMENTS = [
+    '// say "hi',
+    "\r",
+    "/",
+    "1",
+    "2.5",
+    "abc",
+    " ",
+    "\n",
+    '"',
+    "//",
+    "+",
+    "@",
+    "#",
+    "(",
+    ")",
+    "and",
+    "\t",
+    '"x\ny"',
+    "!=",
+]
+
+
+def scan(scanner_class, source, limits, max_errors, **kwargs):
+    out = io.StringIO()
+    errors = Error(out, max_errors)
+    scanner = scanner_class(source, errors, limits, **kwargs)
+    tokens = scanner.scan_tokens()
+    errors.flush()
+    lexed = [(t.type, t.lexeme, t.literal, t.offset) for t in tokens]
+    return lexed, out.getvalue(), scanner.halted, errors.had_error
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_serial_scanner(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        source = "".join(rng.choices(FRAGMENTS, k=rng.randint(50, 400)))
+        limits = rng.choice(
+            [
+                Limits(),
+                Limits(max_tokens=rng.randint(1, 60)),
+                Limits(max_string_length=rng.randint(0, 5)),
+            ]
+        )
+        max_errors = rng.choice([None, 3, 10])
+        chunk_size = rng.randint(5, 40)
+        serial = scan(Scanner, source, limits, max_errors)
+        parallel = scan(
+            ParallelScanner,
+            source,
+            limits,
+            max_errors,
+            workers=2,
+            chunk_size=chunk_size,
+        )
+        assert parallel == serial, (source, limits, max_errors, chunk_size)
+
+
+def test_budget_is_enforced():
+    source = "1 + 2\n" * 100
+    budget = Budget(max_steps=10)
+    with pytest.raises(BudgetExceeded):
+        ParallelScanner(source, Error(), budget=budget, chunk_size=16).scan_tokens()
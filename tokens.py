@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 
 from langtypes import LoxType
+from lines import LineTable
 
 
 class TokenType(Enum):
@@ -61,7 +62,16 @@ class Token:
     type: TokenType
     lexeme: str
     literal: LoxType
-    line: int
+    offset: int
+    lines: LineTable = field(compare=False)
+
+    @property
+    def line(self) -> int:
+        return self.lines.line(self.offset)
+
+    @property
+    def column(self) -> int:
+        return self.lines.column(self.offset)
 
     def __repr__(self) -> str:
         return f"{self.type} {self.lexeme} {self.literal}"